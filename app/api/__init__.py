@@ -1,9 +1,23 @@
 """
 API Package
 統一導出 API 路由
+
+路由模組採延遲載入：import app.api 本身不會連帶 import
+worker.celery_app（Redis 連線設定），只有真正取用該 router 才載入。
 """
 
-from .converter_routes import router as converter_router
-from .ingestion_routes import router as ingestion_router
+import importlib
+
+_ROUTER_MODULES = {
+    "converter_router": ".converter_routes",
+    "ingestion_router": ".ingestion_routes",
+    "storage_router": ".storage_routes",
+}
+
+__all__ = list(_ROUTER_MODULES)
+
 
-__all__ = ["converter_router", "ingestion_router"]
+def __getattr__(name: str):
+    if name in _ROUTER_MODULES:
+        return importlib.import_module(_ROUTER_MODULES[name], __name__).router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
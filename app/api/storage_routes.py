@@ -0,0 +1,97 @@
+"""
+Storage API Routes
+S3 檔案管理端點
+"""
+
+import time
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core import get_storage_client
+from app.services.storage import S3StorageClient
+from common.config import config
+from logs import router_logger as logger
+
+
+# 創建路由器
+router = APIRouter(prefix="/storage")
+
+# 最近一次連線檢查的 (monotonic 時間, 結果)；健康檢查輪詢直接吃快取
+_last_check: tuple[float, bool] = (0.0, False)
+
+
+@router.get("/status")
+async def check_storage_status(client: S3StorageClient = Depends(get_storage_client)):
+    global _last_check
+    checked_at, connected = _last_check
+    if time.monotonic() - checked_at >= config.S3_HEALTH_TTL_S:
+        connected = await client.test_connection()
+        _last_check = (time.monotonic(), connected)
+    return {"status": "ok" if connected else "unavailable", "bucket": client.bucket}
+
+
+@router.get("/config")
+async def get_storage_config(client: S3StorageClient = Depends(get_storage_client)):
+    return {
+        "bucket": client.bucket,
+        "endpoint_url": client.endpoint_url,
+        "region": client.region,
+        "base_path": config.S3_BASE_PATH,
+        "access_key_masked": client.access_key_masked,
+        "secret_key_masked": client.secret_key_masked,
+    }
+
+
+@router.get("/files")
+async def list_storage_files(
+    prefix: str = "",
+    max_keys: int = 1000,
+    parallel: bool = False,
+    buckets: int = 16,
+    client: S3StorageClient = Depends(get_storage_client),
+):
+    if parallel:
+        # 以 hex 字尾切成 sub-prefix，對 S3 併發掃描後合併。
+        # 前提是 key 在 prefix 之後的第一個字元是 hex（本專案的
+        # key 以 SHA-256 hexdigest 命名）；必須剛好 16 個 sub-prefix
+        # 才涵蓋整個 keyspace，少於 16 會默默漏掉部分 key
+        if buckets != 16:
+            raise HTTPException(
+                status_code=422,
+                detail="parallel listing requires buckets=16 "
+                "(one sub-prefix per hex digit)",
+            )
+        sub_prefixes = [f"{prefix}{i:x}" for i in range(16)]
+        files = await client.list_files_parallel(sub_prefixes, max_keys=max_keys)
+    else:
+        files = await client.list_files(prefix=prefix, max_keys=max_keys)
+    return {"count": len(files), "files": files}
+
+
+@router.get("/files/{file_key:path}/url")
+async def generate_file_url(
+    file_key: str,
+    expires_in: int = 3600,
+    client: S3StorageClient = Depends(get_storage_client),
+):
+    url = await client.generate_presigned_url(file_key, expires_in=expires_in)
+    return {"key": file_key, "url": url, "expires_in": expires_in}
+
+
+@router.get("/files/{file_key:path}")
+async def get_file_info(
+    file_key: str, client: S3StorageClient = Depends(get_storage_client)
+):
+    try:
+        return await client.get_file_info(file_key)
+    except Exception as e:
+        logger.warning("File not found: %s (%s)", file_key, e)
+        raise HTTPException(status_code=404, detail=f"File not found: {file_key}")
+
+
+@router.delete("/files/{file_key:path}")
+async def delete_file(
+    file_key: str, client: S3StorageClient = Depends(get_storage_client)
+):
+    await client.delete_file(file_key)
+    return {"status": "deleted", "key": file_key}
@@ -1,4 +1,4 @@
 from .lifespan import lifespan
-from .dependencies import get_session
+from .dependencies import get_session, get_batcher, get_storage_client
 
-__all__ = ["lifespan", "get_session"]
+__all__ = ["lifespan", "get_session", "get_batcher", "get_storage_client"]
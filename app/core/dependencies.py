@@ -1,6 +1,19 @@
-from fastapi import Request
+from fastapi import HTTPException, Request
 import aiohttp
 
+from app.services.ingest_batcher import IngestBatcher
+from app.services.storage import S3StorageClient
+
 
 async def get_session(request: Request) -> aiohttp.ClientSession:
     return request.app.state.session
+
+
+async def get_batcher(request: Request) -> IngestBatcher:
+    return request.app.state.batcher
+
+
+async def get_storage_client(request: Request) -> S3StorageClient:
+    if request.app.state.s3 is None:
+        raise HTTPException(status_code=503, detail="S3 storage is not configured")
+    return request.app.state.s3
@@ -2,9 +2,30 @@ from contextlib import asynccontextmanager
 import aiohttp
 from fastapi import FastAPI
 
+from app.services import storage
+from app.services.ingest_batcher import IngestBatcher
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.session = aiohttp.ClientSession()
+    # 共用的 aiohttp session：連線池 + keep-alive，
+    # 攤平對 ingestion.edgeimpulse.com 的 TCP/TLS 握手成本
+    app.state.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+        ),
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
+    # 批次器：合併短時間內的 ingest 上傳
+    app.state.batcher = IngestBatcher(app.state.session)
+    app.state.batcher.start()
+    # S3 client：啟動時建好（或確定未設定），請求路徑不再檢查設定
+    app.state.s3 = storage.create_storage_client()
     yield
+    await app.state.batcher.stop()
+    if app.state.s3 is not None:
+        await app.state.s3.close()
     await app.state.session.close()
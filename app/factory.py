@@ -1,10 +1,18 @@
+import importlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from common.config import config
-from app.api import converter_router, ingestion_router
 from app.core import lifespan
 
+# (設定開關, 路由模組, OpenAPI tag)
+_ROUTERS = [
+    ("ENABLE_CONVERTER", "app.api.converter_routes", "Edge Impulse Converter"),
+    ("ENABLE_INGESTION", "app.api.ingestion_routes", "Edge Impulse Ingestion"),
+    ("ENABLE_STORAGE", "app.api.storage_routes", "Edge Impulse Storage"),
+]
+
 
 def create_app() -> FastAPI:
     # 創建 FastAPI 應用
@@ -27,12 +35,11 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # Routers
-    app.include_router(
-        converter_router, prefix="/api/v1", tags=["Edge Impulse Converter"]
-    )
-    app.include_router(
-        ingestion_router, prefix="/api/v1", tags=["Edge Impulse Ingestion"]
-    )
+    # Routers：依設定開關載入，關閉的功能連模組都不 import
+    for flag, module_path, tag in _ROUTERS:
+        if not getattr(config, flag):
+            continue
+        router = importlib.import_module(module_path).router
+        app.include_router(router, prefix="/api/v1", tags=[tag])
 
     return app
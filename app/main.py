@@ -56,12 +56,17 @@ from app.factory import create_app
 app = create_app()
 
 if __name__ == "__main__":
-    # List all config values on startup
+    # List all config values on startup (single write, not one per key)
     KEY_PADDING = 40
-    logger.info("=" * 100)
-    for key, value in vars(config).items():
-        logger.info((f"[ENV] {key.ljust(KEY_PADDING)}: {value}"))
-    logger.info("=" * 100)
+    logger.info(
+        "%s\n%s\n%s",
+        "=" * 100,
+        "\n".join(
+            f"[ENV] {key.ljust(KEY_PADDING)}: {value}"
+            for key, value in vars(config).items()
+        ),
+        "=" * 100,
+    )
 
     import uvicorn
 
@@ -70,4 +75,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=6969,
         reload=False,
+        loop="uvloop",
+        http="httptools",
     )
@@ -3,70 +3,203 @@ Edge Impulse Data Converter Service
 處理 Sensor 數據到 Edge Impulse 格式的轉換
 """
 
-import json
+import numpy as np
+import msgspec
 import cbor2
 import hmac
 import time
 import hashlib
 import logging
-from datetime import datetime
-from typing import Tuple, Dict, Any
+from functools import lru_cache
+from operator import attrgetter
 
+from common.config import config
 from common.models.WEDA import VirtualDevice
 
 logger = logging.getLogger(__name__)
 
+# cbor2 找不到 C extension 時會退回純 Python encoder（差一個數量級），
+# 匯入時就確認並把狀況留在 log，不要等上線才發現
+try:
+    import _cbor2  # noqa: F401
 
-def weda_to_edgeimpulse(weda: VirtualDevice, hmac_key: str = "") -> Dict[str, Any]:
+    _CBOR_C_EXT = True
+except ImportError:
+    _CBOR_C_EXT = False
+    logger.warning(
+        "cbor2 C extension not available; falling back to the pure-Python "
+        "encoder, CBOR conversion will be significantly slower"
+    )
+
+
+# 預先綁定的雙欄位 getter，跳過 Pydantic 逐欄位的 descriptor 查找
+_axis_unit = attrgetter("axis", "unit")
+
+
+# JSON 路徑改用 msgspec.Struct：C-level 的欄位槽建構與編碼，
+# 跳過 dict 建構（hash 與 resize）以及編碼時的逐 key 查找。
+# CBOR 路徑仍用 dict + cbor2（typed array 需要 CBORTag）。
+class _EISensor(msgspec.Struct):
+    name: str
+    units: str
+
+
+class _EIPayload(msgspec.Struct):
+    device_name: str
+    device_type: str
+    interval_ms: float
+    sensors: list[_EISensor]
+    values: list
+
+
+class _EIEnvelope(msgspec.Struct):
+    protected: dict
+    signature: str
+    payload: _EIPayload
+
+
+# encoder 是可重用的 singleton，內部 scratch buffer 跨請求攤提
+_json_encoder = msgspec.json.Encoder()
+
+
+# 同一台裝置每次上傳的 sensor 佈局幾乎都一樣（常見就是 3 軸加速度），
+# 以 (axis, unit) tuple 為 key cache 建好的 entries，
+# 命中時省掉逐 sensor 的 dict/Struct 建構；entries 建好後不再被修改
+@lru_cache(maxsize=64)
+def _sensor_structs(axis_units: tuple) -> list:
+    return [_EISensor(name=name, units=units) for name, units in axis_units]
+
+
+@lru_cache(maxsize=64)
+def _sensor_dicts(axis_units: tuple) -> list:
+    return [{"name": name, "units": units} for name, units in axis_units]
+
+# empty signature (all zeros). HS256 gives 32 byte signature, and we
+# encode in hex, so we need 64 characters here
+_EMPTY_SIG = "0" * 64
+_EMPTY_SIG_BYTES = _EMPTY_SIG.encode("ascii")
+
+# CBOR 外層 envelope 的固定 bytes，import 時編好：
+# 0xa3 = 3-entry map；0x78 0x40 = 長度 64 的 text string header。
+# 每次請求只需編 protected（iat 會變）與 payload，外殼直接串接，
+# 輸出與整份 dict 丟給 cbor2.dumps 的結果逐 byte 相同
+_CBOR_ENV_PREFIX = b"\xa3" + cbor2.dumps("protected")
+_CBOR_ENV_MID = (
+    cbor2.dumps("signature") + b"\x78\x40" + _EMPTY_SIG_BYTES + cbor2.dumps("payload")
+)
+# placeholder 在 _CBOR_ENV_MID 裡的位移："signature" key 加 2 bytes header
+_CBOR_SIG_KEY_LEN = len(cbor2.dumps("signature")) + 2
+
+
+@lru_cache(maxsize=2)
+def _cbor_protected(iat: int) -> bytes:
+    """protected header 的 CBOR bytes；iat 以秒為粒度，同秒內直接重用"""
+    return cbor2.dumps({"ver": "v1", "alg": "HS256", "iat": iat})
+
+
+@lru_cache(maxsize=16)
+def _hmac_template(hmac_key: str) -> hmac.HMAC:
+    """已吸收 ipad/opad key block 的 HMAC 狀態，同一把 key 建一次。
+
+    HMAC 初始化要先對 key 做兩輪 SHA-256 block 壓縮；對短訊息來說
+    這筆固定成本佔比不小。把初始化後的狀態 cache 起來，
+    每次簽章只做 copy()（memcpy 等級）再 update 訊息本體。
+    """
+    return hmac.new(hmac_key.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _sign(encoded: bytes, hmac_key: str) -> str:
+    """HMAC-SHA256 over the full encoded buffer."""
+    mac = _hmac_template(hmac_key).copy()
+    mac.update(encoded)
+    return mac.hexdigest()
+
+
+def weda_to_edgeimpulse(
+    weda: VirtualDevice, hmac_key: str = "", file_format: str = "json"
+) -> bytes:
     """Convert WEDA Virtual Device data to EI data acquisition format.
 
     Args:
         weda (VirtualDevice): WEDA Virtual Device data.
         hvac_key (str, optional): EI project HVAC Key. Defaults to "".
+        file_format (str, optional): "json" or "cbor". Defaults to "json".
 
     Returns:
-        Dict[str, Any]: EI data acquisition format encoded in JSON.
+        bytes: EI data acquisition format encoded in JSON or CBOR.
     """
 
-    # sensors list
-    sensors = []
-    for s in weda.sensor_data:
-        sensors.append({"name": s.axis, "units": s.unit})
-
-    # assume all sensors have same number of readings
-    num = len(weda.sensor_data[0].readings)
-    values = []
-    for i in range(num):
-        row = [s.readings[i] for s in weda.sensor_data]
-        values.append(row)
-
-    payload = {
-        "device_name": weda.device_id,
-        "device_type": weda.device_model,
-        "interval_ms": weda.sampling_interval_ms,
-        "sensors": sensors,
-        "values": values,
-    }
-
-    # empty signature (all zeros). HS256 gives 32 byte signature, and we encode in hex, so we need 64 characters here
-    emptySignature = "".join(["0"] * 64)
-
-    ei_data = {
-        "protected": {"ver": "v1", "alg": "HS256", "iat": time.time()},
-        "signature": emptySignature,
-        "payload": payload,
-    }
-
-    # encode in JSON
-    encoded = json.dumps(ei_data)
-
-    # sign message
-    signature = hmac.new(
-        bytes(hmac_key, "utf-8"), msg=encoded.encode("utf-8"), digestmod=hashlib.sha256
-    ).hexdigest()
-
-    # set the signature again in the message, and encode again
-    ei_data["signature"] = signature
-    ei_data = json.dumps(ei_data)
-
-    return ei_data
+    # (sensors, samples) 矩陣做 C-level transpose，
+    # 取代逐 sample 的 Python 雙迴圈；驗證階段建好的矩陣直接重用
+    matrix = weda._readings_matrix
+    if matrix is None:
+        matrix = np.asarray(
+            [s.readings for s in weda.sensor_data], dtype=np.float64
+        )
+    transposed = matrix.T
+
+    # 單趟序列化：帶著 placeholder 編碼一次、簽名，
+    # 再直接在輸出 bytes 裡把 placeholder 換成實際簽章，
+    # 不必為了簽章重新編碼整份 payload
+    axis_units = tuple(map(_axis_unit, weda.sensor_data))
+
+    if file_format == "cbor":
+        sensors = _sensor_dicts(axis_units)
+        if config.EI_CBOR_TYPED_VALUES:
+            # RFC 8746 tag 85：float32 little-endian typed array。
+            # 整個矩陣變成一次 memcpy（3-5 bytes header），
+            # 省掉巢狀 array 每個元素 ~9 bytes 的 tag 與 float64 編碼
+            flat = np.ascontiguousarray(transposed, dtype="<f4")
+            values = cbor2.CBORTag(85, flat.tobytes())
+        else:
+            values = transposed.tolist()
+        payload = {
+            "device_name": weda.device_id,
+            "device_type": weda.device_model,
+            "interval_ms": weda.sampling_interval_ms,
+            "sensors": sensors,
+            "values": values,
+        }
+        if config.EI_CBOR_TYPED_VALUES:
+            # 展平後的 (samples, sensors) 形狀，收端還原用
+            payload["values_shape"] = list(transposed.shape)
+        # cbor2 的 C extension 直接輸出 IEEE 754 floats，
+        # 不經過 per-element 的 Python boxing。
+        # 只編碼 payload 本體，外層 envelope 直接組進 bytearray；
+        # placeholder 的位移是算出來的，之後完全不用搜尋
+        protected = _cbor_protected(int(time.time()))
+        encoded = bytearray(_CBOR_ENV_PREFIX)
+        encoded += protected
+        encoded += _CBOR_ENV_MID
+        encoded += cbor2.dumps(payload)
+        sig_offset = (
+            len(_CBOR_ENV_PREFIX) + len(protected) + _CBOR_SIG_KEY_LEN
+        )
+    else:
+        # 熱路徑：Struct 一路到底，不經過中介 dict
+        envelope = _EIEnvelope(
+            protected={"ver": "v1", "alg": "HS256", "iat": int(time.time())},
+            signature=_EMPTY_SIG,
+            payload=_EIPayload(
+                device_name=weda.device_id,
+                device_type=weda.device_model,
+                interval_ms=weda.sampling_interval_ms,
+                sensors=_sensor_structs(axis_units),
+                values=transposed.tolist(),
+            ),
+        )
+        # encode_into 直接寫進 bytearray，簽章可以原地換掉 placeholder
+        encoded = bytearray()
+        _json_encoder.encode_into(envelope, encoded)
+        # signature 欄位緊跟在 protected 之後，限制在 buffer 開頭搜尋，
+        # 不必掃過後面大得多的 values 區段
+        sig_offset = encoded.index(_EMPTY_SIG_BYTES, 0, 256)
+
+    signature = _sign(encoded, hmac_key)
+
+    # 等長的 hex 簽章原地蓋掉 placeholder，不再 .replace() 全檔掃描
+    # 加重建一份新 buffer
+    encoded[sig_offset : sig_offset + len(_EMPTY_SIG_BYTES)] = signature.encode(
+        "ascii"
+    )
+    return bytes(encoded)
@@ -0,0 +1,116 @@
+"""
+Edge Impulse Ingest Batcher
+將多個 ingest 請求合併為批次送出，攤平每請求的網路開銷
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Union
+
+import aiohttp
+
+from common.config import config
+from logs import router_logger as logger
+
+
+INGESTION_URL = "https://ingestion.edgeimpulse.com/api/{dataset}/data"
+
+
+@dataclass
+class _PendingUpload:
+    """等待批次送出的單筆上傳"""
+
+    ei_data: Union[str, bytes]
+    headers: dict
+    dataset: str
+    future: asyncio.Future
+
+
+class IngestBatcher:
+    """
+    以 asyncio.Queue 累積 ingest 請求，湊滿 EI_BATCH_MAX 筆
+    或等滿 EI_BATCH_WINDOW_MS 後，將整批透過共用 session 的
+    keep-alive 連線池併發送出，並逐筆 resolve 對應的 future。
+
+    佇列深度為 1 且視窗到期時退化為單筆 POST。
+    """
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self._session = session
+        self._queue: asyncio.Queue[_PendingUpload] = asyncio.Queue()
+        self._drain_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._drain_task = asyncio.create_task(self._drain_loop())
+
+    async def stop(self) -> None:
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(
+        self, ei_data: Union[str, bytes], headers: dict, dataset: str
+    ) -> None:
+        """送入一筆上傳並等待其所屬批次完成"""
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingUpload(ei_data, headers, dataset, future))
+        await future
+
+    async def _drain_loop(self) -> None:
+        window_s = config.EI_BATCH_WINDOW_MS / 1000
+        while True:
+            # 批次內的例外不能殺掉 drain task：loop 一死，之後所有
+            # submit() 都會永遠卡住。CancelledError 不在此攔截，
+            # stop() 仍能正常收掉 task
+            try:
+                batch = [await self._queue.get()]
+                deadline = asyncio.get_running_loop().time() + window_s
+                while len(batch) < config.EI_BATCH_MAX:
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(
+                                self._queue.get(), timeout=remaining
+                            )
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                await self._post_batch(batch)
+            except Exception:
+                logger.exception("Ingest batch failed unexpectedly")
+
+    async def _post_batch(self, batch: list[_PendingUpload]) -> None:
+        logger.debug("Posting ingest batch of %d upload(s)", len(batch))
+        await asyncio.gather(*(self._post_one(item) for item in batch))
+
+    async def _post_one(self, item: _PendingUpload) -> None:
+        body = item.ei_data
+        if isinstance(body, (bytes, bytearray)):
+            # bytes 直接包成 BytesPayload：aiohttp 不再為 str 做
+            # UTF-8 重新編碼，且已知長度會帶 Content-Length、
+            # 跳過 chunked transfer framing
+            body = aiohttp.payload.BytesPayload(
+                body, content_type=item.headers.get("Content-Type")
+            )
+        try:
+            async with self._session.post(
+                INGESTION_URL.format(dataset=item.dataset),
+                headers=item.headers,
+                data=body,
+            ) as res:
+                res.raise_for_status()
+            # submitter 可能在等待中被取消（client 斷線、shutdown），
+            # future 已是 cancelled；set_result 會丟 InvalidStateError
+            if not item.future.done():
+                item.future.set_result(None)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+            else:
+                # 沒人在等了，錯誤至少留在 log
+                logger.warning("Ingest upload failed after submitter left: %s", e)
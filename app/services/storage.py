@@ -0,0 +1,212 @@
+"""
+S3 Storage Client
+管理轉換後資料在 S3 上的儲存與查詢
+"""
+
+import asyncio
+import io
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Final, List, Optional
+
+import aioboto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+
+from common.config import config
+
+logger = logging.getLogger(__name__)
+
+# 每個上傳物件都帶的基本 metadata；無額外 metadata 的常見路徑
+# 直接重用同一個 dict，不複製也不改動呼叫端傳入的 dict
+_BASE_META: Final[Dict[str, str]] = {"uploaded_by": "edge-impulse-converter"}
+
+
+@lru_cache(maxsize=1)
+def _shared_session() -> aioboto3.Session:
+    """整個 process 共用一個 aioboto3 Session。
+
+    Session 建構要跑 botocore 的 loader 與 credential 解析，
+    是 S3StorageClient 裡最貴的一步；多個 client 實例
+    （例如 Celery task 各自建一個）共用即可。
+    client 本身綁定 event loop，不能跨 loop cache，所以只 cache 到
+    Session 這層。
+    """
+    return aioboto3.Session()
+
+
+class S3StorageClient:
+    """封裝 aioboto3 的 S3 操作；所有 I/O 都不阻塞 event loop"""
+
+    def __init__(
+        self,
+        endpoint_url: Optional[str],
+        bucket: str,
+        region: Optional[str],
+        access_key: str,
+        secret_key: str,
+        use_ssl: bool = False,
+    ):
+        self.bucket = bucket
+        self._access_key = access_key
+        self._secret_key = secret_key
+        # 遮罩後的金鑰：建構時算一次，admin 端點直接回傳
+        self.access_key_masked = access_key[:4] + "****" + access_key[-4:]
+        self.secret_key_masked = secret_key[:4] + "****" + secret_key[-4:]
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self._client_kwargs = dict(
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            use_ssl=use_ssl,
+            # 連線池開大、TCP keep-alive：併發上傳不再重跑 TLS 握手
+            config=BotoConfig(max_pool_connections=64, tcp_keepalive=True),
+        )
+        self._session = _shared_session()
+        self._client = None
+        # transfer manager 設定：小檔單一 PUT、大檔自動 multipart
+        self._transfer_config = TransferConfig(
+            multipart_threshold=config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=config.S3_MULTIPART_THRESHOLD,
+            max_concurrency=config.S3_MULTIPART_CONCURRENCY,
+        )
+
+    async def _get_client(self):
+        """延遲建立並重用同一個 aioboto3 client（連線池共用）"""
+        if self._client is None:
+            self._client_cm = self._session.client("s3", **self._client_kwargs)
+            self._client = await self._client_cm.__aenter__()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client_cm.__aexit__(None, None, None)
+            self._client = None
+
+    async def upload_file(
+        self,
+        key: str,
+        content: bytes,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """上傳檔案；transfer manager 依門檻自動走單一 PUT 或 multipart
+
+        upload_fileobj 逐段從 buffer 讀出、逐段釋放，不像
+        put_object(Body=bytes) 同時抱著兩份完整 payload。
+        """
+        client = await self._get_client()
+        meta = _BASE_META if not metadata else {**_BASE_META, **metadata}
+        await client.upload_fileobj(
+            io.BytesIO(content),
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type, "Metadata": meta},
+            Config=self._transfer_config,
+        )
+        return key
+
+    async def upload_files(
+        self, files: List[tuple[str, bytes, str]]
+    ) -> List[str]:
+        """併發上傳多個 (key, content, content_type)，重疊網路延遲"""
+        return list(
+            await asyncio.gather(
+                *(
+                    self.upload_file(key, content, content_type)
+                    for key, content, content_type in files
+                )
+            )
+        )
+
+    async def list_files(
+        self, prefix: str = "", max_keys: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """列出 bucket 內符合 prefix 的檔案"""
+        client = await self._get_client()
+        res = await client.list_objects_v2(
+            Bucket=self.bucket, Prefix=prefix, MaxKeys=max_keys
+        )
+        return [
+            {
+                "key": obj["Key"],
+                "size": obj["Size"],
+                "last_modified": obj["LastModified"].isoformat(),
+            }
+            for obj in res.get("Contents", [])
+        ]
+
+    async def list_files_parallel(
+        self, prefixes: List[str], max_keys: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """對多個 prefix 併發執行 list_objects_v2 並合併結果"""
+        semaphore = asyncio.Semaphore(config.S3_LIST_CONCURRENCY)
+
+        async def list_one(prefix: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.list_files(prefix=prefix, max_keys=max_keys)
+
+        results = await asyncio.gather(*(list_one(p) for p in prefixes))
+        merged = [f for sub in results for f in sub]
+        merged.sort(key=lambda f: f["key"])
+        return merged
+
+    async def get_file_info(self, key: str) -> Dict[str, Any]:
+        """取得單一檔案的 metadata"""
+        client = await self._get_client()
+        res = await client.head_object(Bucket=self.bucket, Key=key)
+        return {
+            "key": key,
+            "size": res["ContentLength"],
+            "content_type": res.get("ContentType"),
+            "last_modified": res["LastModified"].isoformat(),
+            "metadata": res.get("Metadata", {}),
+        }
+
+    async def delete_file(self, key: str) -> None:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def generate_presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        client = await self._get_client()
+        return await client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    async def test_connection(self) -> bool:
+        """確認 bucket 可連線"""
+        try:
+            client = await self._get_client()
+            await client.head_bucket(Bucket=self.bucket)
+            return True
+        except Exception as e:
+            logger.error("S3 connection test failed: %s", e)
+            return False
+
+
+def create_storage_client() -> Optional[S3StorageClient]:
+    """依設定建立 S3StorageClient；設定不完整時回傳 None
+
+    在 lifespan 啟動時呼叫一次，設定檢查不再落在每個請求上。
+    """
+    if not all(
+        [
+            config.S3_BUCKET,
+            config.S3_ACCESS_KEY,
+            config.S3_SECRET_KEY,
+        ]
+    ):
+        logger.warning("S3 storage is not configured; storage endpoints disabled")
+        return None
+    return S3StorageClient(
+        endpoint_url=config.S3_ENDPOINT_URL,
+        bucket=config.S3_BUCKET,
+        region=config.S3_REGION,
+        access_key=config.S3_ACCESS_KEY,
+        secret_key=config.S3_SECRET_KEY,
+        use_ssl=config.S3_USE_SSL,
+    )
@@ -0,0 +1,71 @@
+"""
+Celery Task Status Service
+以短 TTL 快取加單次 Redis 往返查詢任務狀態，
+避免輪詢面板對 backend 造成 O(N) 次往返
+"""
+
+import json
+import time
+from typing import Any, Dict
+
+from celery import states
+from celery.result import AsyncResult
+
+from worker.celery_app import celery_app
+
+# task_id -> (monotonic 到期時間, 回應內容)
+_CACHE: Dict[str, tuple] = {}
+_CACHE_TTL_S = 1.0
+_CACHE_MAX = 10_000
+
+
+def _fetch_status(task_id: str) -> Dict[str, Any]:
+    backend = celery_app.backend
+    client = getattr(backend, "client", None)
+    if client is None:
+        # 非 Redis backend：退回標準 AsyncResult 查詢
+        task_result = AsyncResult(task_id, app=celery_app)
+        return {
+            "task_id": task_id,
+            "state": task_result.state,
+            "status": task_result.status,
+            "result": task_result.result if task_result.ready() else None,
+        }
+
+    # 直接抓 meta key：state + result 一次 Redis 往返
+    raw = client.get(f"celery-task-meta-{task_id}")
+    if raw is None:
+        return {
+            "task_id": task_id,
+            "state": states.PENDING,
+            "status": states.PENDING,
+            "result": None,
+        }
+    # Redis KV backend 的 value 沒有 content-type 標頭，backend.decode
+    # 只認 result_serializer（msgpack）；切換序列化器後、還沒過期的
+    # 舊 JSON meta 會讓 unpackb 丟例外，這裡退回 json.loads 接住
+    try:
+        meta = backend.decode(raw)
+    except Exception:
+        meta = json.loads(raw)
+    state = meta["status"]
+    return {
+        "task_id": task_id,
+        "state": state,
+        "status": state,
+        "result": meta["result"] if state in states.READY_STATES else None,
+    }
+
+
+def get_task_status(task_id: str) -> Dict[str, Any]:
+    """查詢任務狀態；1 秒內的重複輪詢直接回快取"""
+    now = time.monotonic()
+    cached = _CACHE.get(task_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    status = _fetch_status(task_id)
+    if len(_CACHE) >= _CACHE_MAX:
+        _CACHE.clear()
+    _CACHE[task_id] = (now + _CACHE_TTL_S, status)
+    return status
@@ -20,6 +20,11 @@ class Config(BaseSettings):
         default="development"
     )
 
+    # Feature switches：關閉的功能其路由模組不會被 import
+    ENABLE_CONVERTER: bool = Field(default=True)
+    ENABLE_INGESTION: bool = Field(default=True)
+    ENABLE_STORAGE: bool = Field(default=True)
+
     ##########################
     ### S3 Configuration ###
     ##########################
@@ -35,6 +40,23 @@ class Config(BaseSettings):
     # S3 Base path for uploaded files
     S3_BASE_PATH: str = Field(default="edge-impulse-data")
 
+    # Multipart upload: payloads above the threshold are uploaded
+    # as concurrent parts of the same size
+    S3_MULTIPART_THRESHOLD: int = Field(default=8 * 1024 * 1024)
+    S3_MULTIPART_CONCURRENCY: int = Field(default=8)
+
+    # How long /storage/status may reuse the last connection check (seconds)
+    S3_HEALTH_TTL_S: float = Field(default=5.0)
+
+    # Concurrent list_objects_v2 calls when listing prefixes in parallel
+    S3_LIST_CONCURRENCY: int = Field(default=8)
+
+    ################
+    ### Database ###
+    ################
+
+    DATABASE_URL: str = Field(default="sqlite:///./data/plugin_server.db")
+
     ##############
     ### Celery ###
     ##############
@@ -42,6 +64,12 @@ class Config(BaseSettings):
     CELERY_BROKER_URL: Optional[str] = Field(default="redis://localhost:6379/0")
     CELERY_RESULT_BACKEND: Optional[str] = Field(default="redis://localhost:6379/1")
 
+    # Worker pool 實作；EI_ingestion worker 建議 prefork 搭配較高的
+    # prefetch 重疊網路延遲（celery -A worker worker -Q EI_ingestion
+    # -P prefork -c 8 --prefetch-multiplier 16）。不要用 eventlet/threads：
+    # device_task 的 module-level asyncio loop 跟兩者都不相容
+    CELERY_WORKER_POOL: str = Field(default="solo")
+
     ######################
     ### Virtual Device ###
     ######################
@@ -56,9 +84,32 @@ class Config(BaseSettings):
     # Ingestion API Endpoint
     EI_INGESTION_ENDPOINT: Optional[str] = Field(default=None)
 
+    # Edge Impulse API Key；上傳請求沒帶 api_key 時的預設值
+    EI_API_KEY: Optional[str] = Field(default=None)
+
     # HMAC Key for signing data (optional, leave empty if not needed)
     EI_HMAC_KEY: Optional[str] = Field(default="")
 
+    # Studio API（訓練與部署用）
+    EI_API_BASE_URL: str = Field(default="https://studio.edgeimpulse.com")
+    EI_PROJECT_ID: Optional[str] = Field(default=None)
+
+    # 已上傳樣本累積到此數量時自動觸發訓練
+    AUTO_TRAINING_THRESHOLD: int = Field(default=100)
+
+    # Upper bound on sensors x samples accepted in one upload
+    MAX_SAMPLES: int = Field(default=1_000_000)
+
+    # Encode CBOR "values" as an RFC 8746 float32 typed array (tag 85)
+    # instead of nested arrays — ~4x smaller and near-memcpy encode speed.
+    # Off by default until the receiving side understands typed arrays
+    EI_CBOR_TYPED_VALUES: bool = Field(default=False)
+
+    # Ingest batching: flush when EI_BATCH_MAX uploads are queued
+    # or EI_BATCH_WINDOW_MS elapses, whichever comes first
+    EI_BATCH_MAX: int = Field(default=64)
+    EI_BATCH_WINDOW_MS: int = Field(default=20)
+
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", case_sensitive=True
     )
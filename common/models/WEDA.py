@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import List, Optional
+
+from common.config import config
 
 
 ##############################################
@@ -20,3 +23,44 @@ class VirtualDevice(BaseModel):
         ..., description="Sampling interval in milliseconds"
     )
     sensor_data: List[SensorData] = Field(..., description="List of sensor data")
+
+    # 驗證時建好的 (sensors, samples) 矩陣，轉換器可直接重用
+    _readings_matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @model_validator(mode="before")
+    @classmethod
+    def reject_oversized_payload(cls, data):
+        # 在 Pydantic 逐元素轉換 float 之前，先用 len() 估總樣本數
+        # 擋掉過大的 payload，不浪費 CPU 在註定被拒絕的資料上
+        if isinstance(data, dict):
+            sensor_data = data.get("sensor_data")
+            if isinstance(sensor_data, list) and sensor_data:
+                first = sensor_data[0]
+                readings = first.get("readings") if isinstance(first, dict) else None
+                if (
+                    isinstance(readings, list)
+                    and len(sensor_data) * len(readings) > config.MAX_SAMPLES
+                ):
+                    raise ValueError(
+                        f"sensor payload exceeds MAX_SAMPLES ({config.MAX_SAMPLES})"
+                    )
+        return data
+
+    @model_validator(mode="after")
+    def validate_readings_shape(self):
+        # 一次 C-level 建陣列：readings 長度不一致（ragged）或含
+        # 非數值時 NumPy 會直接 raise，免去逐筆 Python 迴圈檢查
+        try:
+            arr = np.asarray(
+                [s.readings for s in self.sensor_data], dtype=np.float64
+            )
+        except ValueError:
+            raise ValueError("all sensor readings must have the same length")
+        except TypeError:
+            raise ValueError("sensor readings must be numeric")
+        if arr.ndim != 2:
+            raise ValueError("sensor readings must form a 2-D matrix")
+        if arr.shape[1] == 0:
+            raise ValueError("sensor readings must not be empty")
+        self._readings_matrix = arr
+        return self
@@ -1,3 +1,3 @@
-from .upload_request import UploadRequest
+from .upload_request import UploadRequest, UPLOAD_REQUEST_ADAPTER
 
-__all__ = ["UploadRequest"]
+__all__ = ["UploadRequest", "UPLOAD_REQUEST_ADAPTER"]
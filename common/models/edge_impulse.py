@@ -13,13 +13,16 @@ class DatasetType(str, Enum):
     TESTING = "testing"
 
 
+class FileFormat(str, Enum):
+    JSON = "json"
+    CBOR = "cbor"
+
+
 # Metadata for uploading to Edge Impulse
 class UploadMetadata(BaseModel):
-    ################################
-    ### FIXME: To remove the key ###
-    ################################
-    api_key: str = Field(
-        default="ei_1df40caea3a8ff4b9869f87c5fef6f3408a7e89982cac9ddd017e964fcbca70a",
+    # 未提供時使用 config.EI_API_KEY
+    api_key: Optional[str] = Field(
+        default=None,
         description="Edge Impulse API Key",
     )
     hmac_key: str = Field(
@@ -34,6 +37,9 @@ class UploadMetadata(BaseModel):
     dataset_type: DatasetType = Field(
         default=DatasetType.TRAINING, description="Dataset type for upload"
     )
+    file_format: FileFormat = Field(
+        default=FileFormat.JSON, description="Upload encoding format"
+    )
 
     @model_validator(mode="after")
     def enforce_no_label_logic(self):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 from .edge_impulse import UploadMetadata
 from .WEDA import VirtualDevice
@@ -44,3 +44,8 @@ class UploadRequest(BaseModel):
             }
         }
     }
+
+
+# 模組層級快取的 TypeAdapter：重用編譯好的 core schema，
+# 解析 dict payload（如 Celery 任務參數）時不必重建驗證器
+UPLOAD_REQUEST_ADAPTER = TypeAdapter(UploadRequest)
@@ -6,6 +6,7 @@ including training tasks and other asynchronous operations.
 """
 
 from celery import Celery
+from celery.schedules import crontab
 from kombu import Queue
 
 from common.config import config
@@ -19,29 +20,54 @@ def create_celery_app() -> Celery:
         broker=config.CELERY_BROKER_URL,
         backend=config.CELERY_RESULT_BACKEND,
         include=[
-            "app.tasks.ei_task",
+            "worker.tasks.ei_task",
+            "worker.tasks.device_task",
+            "worker.tasks.training_task",
         ],
     )
 
     # Celery configuration
     app.conf.update(
         # Serializer settings
-        task_serializer="json",
-        accept_content=["json"],
-        result_serializer="json",
+        # msgpack 是二進位格式：float 不經過十進位字串轉換，
+        # WEDA 時間序列 payload 的編碼 CPU 與 broker 流量都較低。
+        # accept_content 保留 json 讓還在佇列中的舊訊息能順利消化
+        task_serializer="msgpack",
+        accept_content=["msgpack", "json"],
+        # 結果也走 msgpack：任務回傳的都是小 dict，二進位編碼
+        # 省掉 backend 寫入的編碼 CPU。注意 Redis KV backend 存的
+        # value 沒有 content-type，讀取只認 result_serializer——
+        # result_accept_content 救不了切換前寫入的 JSON meta；
+        # 舊 meta 由 task_status 的 json.loads fallback 接住，
+        # 且最多存活 result_expires（1 小時）
+        result_serializer="msgpack",
+        result_accept_content=["msgpack", "json"],
         # Timezone settings
         timezone="UTC",
         enable_utc=True,
-        # Queue configuration
+        # Queue configuration。短而 I/O 密集的上傳走 EI_ingestion、
+        # 長時間的訓練相關任務走 EI_training，各自由獨立的 worker
+        # 消化（-Q EI_ingestion -P prefork -c 8 /
+        # -Q EI_training -P prefork -c 2），互不搶佔。
+        # EI_ingestion 不能用 eventlet：device_task 靠 module-level 的
+        # asyncio loop 跑 httpx，monkey-patch 之後 run_until_complete
+        # 會卡死 eventlet hub（threads pool 也不行，會併發共用同一個 loop）
         task_default_queue="default",
         task_queues=(
             Queue("default"),
             Queue("EI_ingestion", routing_key="EI_ingestion"),
+            Queue("EI_training", routing_key="EI_training"),
         ),
         # Task execution settings
         task_reject_on_worker_lost=True,
         task_acks_late=True,
-        worker_prefetch_multiplier=1,
+        # 失敗/逾時不 ack，讓訊息可以重新投遞；上傳任務以
+        # Redis idempotency key 短路已完成的重送，不會重複上傳
+        task_acks_on_failure_or_timeout=False,
+        # prefetch 不在這裡全域鎖死成 1：EI_ingestion 這種短 I/O 任務
+        # 靠較高的 prefetch 重疊網路延遲，各 worker 在 CLI 上自行設定
+        # （例如 -P prefork -c 8 --prefetch-multiplier 16；
+        # 訓練 worker 則維持 solo/prefork 與低 prefetch）
         task_time_limit=2 * 3600 + 60,  # 2 hours + 1 minute grace period
         task_soft_time_limit=2 * 3600,  # 2 hours
         # Retry settings
@@ -50,11 +76,41 @@ def create_celery_app() -> Celery:
         # Result settings
         result_persistent=False,
         result_expires=3600,  # 1 hour
+        # fire-and-forget 任務都標了 ignore_result；失敗仍寫回
+        # backend，排查時查得到 traceback
+        task_store_errors_even_if_ignored=True,
         # Redis Backend setting
         redis_backend_health_check_interval=30,
         redis_socket_timeout=5,
+        # Broker 連線：TCP keepalive 擋掉 NAT/防火牆靜默斷線，
+        # 定期 health check 讓斷線被主動偵測而不是等任務失敗
+        broker_transport_options={
+            "socket_keepalive": True,
+            "health_check_interval": 30,
+        },
+        result_backend_transport_options={
+            "socket_keepalive": True,
+        },
         # Worker settings
-        worker_pool="solo",
+        worker_pool=config.CELERY_WORKER_POOL,
+        # Beat schedule：單一輪詢任務掃描所有進行中的訓練
+        beat_schedule={
+            "poll-pending-trainings": {
+                "task": "worker.tasks.training_task.poll_pending_trainings",
+                "schedule": 30.0,
+            },
+            # 每小時以 DB 為準校正上傳計數器
+            "reconcile-uploaded-count": {
+                "task": "worker.tasks.training_task.reconcile_uploaded_count",
+                "schedule": 3600.0,
+            },
+            # 定期清掉過期的 result meta key，backend 不靠 Redis
+            # 被動過期也不會累積
+            "backend-cleanup": {
+                "task": "celery.backend_cleanup",
+                "schedule": crontab(minute=0, hour="*/4"),
+            },
+        },
     )
     return app
 
@@ -0,0 +1,77 @@
+"""
+Worker Database
+資料採集與訓練任務共用的 SQLAlchemy engine 與 ORM models
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    Text,
+    create_engine,
+)
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.engine import make_url
+
+from common.config import config
+
+# SQLite 的資料庫目錄（預設 ./data/）在 fresh checkout 不存在，
+# SQLite 不會自己建目錄；先建好，import 時的 create_all 才開得了檔
+_db_url = make_url(config.DATABASE_URL)
+if _db_url.get_backend_name() == "sqlite" and _db_url.database:
+    Path(_db_url.database).parent.mkdir(parents=True, exist_ok=True)
+
+# 明確的連線池設定：pre-ping 擋掉 idle 斷線、recycle 避免
+# 被防火牆/DB 端靜默回收、LIFO 讓熱連線優先重用，
+# 短任務不再每次重跑 TCP/TLS 交握
+engine = create_engine(
+    config.DATABASE_URL,
+    pool_size=4,
+    max_overflow=8,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_use_lifo=True,
+)
+SessionLocal = scoped_session(sessionmaker(bind=engine))
+Base = declarative_base()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DataSample(Base):
+    """從 Virtual Device 取回、待上傳到 Edge Impulse 的樣本"""
+
+    __tablename__ = "data_samples"
+
+    id = Column(Integer, primary_key=True)
+    device_id = Column(String(64), index=True, nullable=False)
+    label = Column(String(64), nullable=True)
+    # EI data acquisition 格式的 JSON 內容
+    payload = Column(Text, nullable=False)
+    uploaded_to_ei = Column(Boolean, default=False, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+
+
+class TrainingJob(Base):
+    """Edge Impulse 訓練任務的本地追蹤紀錄"""
+
+    __tablename__ = "training_jobs"
+
+    id = Column(Integer, primary_key=True)
+    ei_job_id = Column(String(64), nullable=True)
+    # pending -> running -> done / failed
+    status = Column(String(16), default="pending", nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow, nullable=False
+    )
+
+
+Base.metadata.create_all(bind=engine)
@@ -0,0 +1,14 @@
+"""
+Worker Redis Connection
+任務間共享的計數器與鎖所用的 Redis 連線
+"""
+
+import redis
+
+from common.config import config
+
+redis_client = redis.Redis.from_url(config.CELERY_BROKER_URL)
+
+# 自上次觸發訓練以來已上傳到 EI 的樣本數；
+# O(1) 的原子計數器取代每次 check_auto_training 的 COUNT 掃描
+UPLOADED_COUNT_KEY = "phm:ei_uploaded_count"
@@ -0,0 +1,187 @@
+"""
+Virtual Device Tasks
+從 Virtual Device 取回樣本、批次上傳到 Edge Impulse
+"""
+
+import asyncio
+import json
+import os
+
+import httpx
+from sqlalchemy import insert
+
+from common.config import config
+from logs import worker_logger as logger
+from worker import celery_app
+from worker.db import DataSample, SessionLocal
+from worker.redis_conn import UPLOADED_COUNT_KEY, redis_client
+
+INGESTION_URL = "https://ingestion.edgeimpulse.com/api/training/data"
+
+# API key 來自設定，不再寫死在程式碼裡
+API_KEY = config.EI_API_KEY or ""
+
+# 每個 worker process 一個長連線 client；對 Virtual Device 的
+# 輪詢重用 keep-alive 連線，不必每個 task 重新交握
+_VD_CLIENT = httpx.Client(timeout=10)
+
+# 每個 worker process 一個常駐 event loop：asyncio.run 每次
+# 建新 loop、結束就拆掉，連線池與 DNS cache 全部跟著陪葬；
+# 固定用同一個 loop，AsyncClient 的 TLS 連線池才能跨 task 存活。
+# 不能在 import 時建立：prefork 的 parent 先 import 再 fork，
+# import 時建的 loop 會讓所有 child 繼承同一個 epoll fd 與
+# self-pipe。延遲到第一次使用、並記住建立時的 pid，
+# fork 之後在 child 裡重建自己的 loop 與 client
+_LOOP: asyncio.AbstractEventLoop | None = None
+_EI_ASYNC_CLIENT: httpx.AsyncClient | None = None
+_LOOP_PID: int | None = None
+
+
+def _ensure_loop() -> tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]:
+    global _LOOP, _EI_ASYNC_CLIENT, _LOOP_PID
+    if _LOOP is None or _LOOP_PID != os.getpid():
+        _LOOP = asyncio.new_event_loop()
+        asyncio.set_event_loop(_LOOP)
+        _EI_ASYNC_CLIENT = httpx.AsyncClient(timeout=30)
+        _LOOP_PID = os.getpid()
+    return _LOOP, _EI_ASYNC_CLIENT
+
+
+def run_async(coro):
+    """在同步的 Celery task 裡、本 process 的常駐 loop 上執行 coroutine"""
+    loop, _ = _ensure_loop()
+    return loop.run_until_complete(coro)
+
+
+@celery_app.task(
+    bind=True,
+    queue="EI_ingestion",
+    ignore_result=True,
+    time_limit=60,
+    soft_time_limit=45,
+)
+def fetch_virtual_device_data(self, device_id: str, limit: int = 100):
+    """取回 Virtual Device 的樣本並存入資料庫，再排一個批次上傳任務。
+
+    上傳走單一 upload_batch_to_edge_impulse 任務，不是每個樣本各排
+    一則訊息：broker round-trip、DB 查詢與 TLS 握手都攤在整個批次上。
+    """
+    try:
+        res = _VD_CLIENT.get(
+            f"{config.VIRTUAL_DEVICE_URL}/api/devices/{device_id}/samples",
+            params={"limit": limit},
+            headers={"x-api-key": config.VIRTUAL_DEVICE_API_KEY or ""},
+        )
+        res.raise_for_status()
+        samples = res.json().get("samples", [])
+
+        # 單一 multi-row INSERT 取代逐筆 db.add 的 N 次 round-trip；
+        # RETURNING 直接拿回新 id，不用再補一次 SELECT
+        rows = [
+            {
+                "device_id": device_id,
+                "label": sample.get("label"),
+                "payload": json.dumps(sample),
+            }
+            for sample in samples
+        ]
+        sample_ids = []
+        if rows:
+            with SessionLocal() as db:
+                with db.begin():
+                    sample_ids = (
+                        db.execute(
+                            insert(DataSample).returning(DataSample.id), rows
+                        )
+                        .scalars()
+                        .all()
+                    )
+
+        if sample_ids:
+            upload_batch_to_edge_impulse.delay(sample_ids)
+        return {"status": "success", "fetched": len(sample_ids)}
+    except Exception as e:
+        # Celery auto retry
+        raise self.retry(exc=e, countdown=5, max_retries=3)
+
+
+async def _post_sample(client: httpx.AsyncClient, sample_id: int, label, body: str):
+    """上傳單一樣本；成功回傳 sample id，失敗記 log 並回傳 None"""
+    try:
+        res = await client.post(
+            INGESTION_URL,
+            headers={
+                "Content-Type": "application/json",
+                "x-file-name": f"sample_{sample_id}.json",
+                "x-label": label or "",
+                "x-no-label": "0" if label else "1",
+                "x-api-key": API_KEY,
+            },
+            content=body,
+        )
+        res.raise_for_status()
+        return sample_id
+    except httpx.HTTPError as e:
+        logger.warning("Upload failed for sample %s: %s", sample_id, e)
+        return None
+
+
+@celery_app.task(
+    bind=True,
+    queue="EI_ingestion",
+    ignore_result=True,
+    time_limit=60,
+    soft_time_limit=45,
+)
+def upload_batch_to_edge_impulse(self, sample_ids: list):
+    """批次上傳樣本到 Edge Impulse。
+
+    一次 SELECT ... WHERE id IN (...) 撈出整批、同一個 AsyncClient
+    重疊所有上傳（連線重用、延遲互相掩蓋）、一次 bulk update 寫回
+    上傳狀態，最後只排一則 check_auto_training 訊息。
+    """
+    try:
+        with SessionLocal() as db:
+            samples = (
+                db.query(DataSample)
+                .filter(
+                    DataSample.id.in_(sample_ids),
+                    DataSample.uploaded_to_ei.is_(False),
+                )
+                .all()
+            )
+            pending = [(s.id, s.label, s.payload) for s in samples]
+
+        if not pending:
+            return {"status": "success", "uploaded": 0}
+
+        async def upload_all():
+            _, client = _ensure_loop()
+            return await asyncio.gather(
+                *(
+                    _post_sample(client, sid, label, body)
+                    for sid, label, body in pending
+                )
+            )
+
+        uploaded = [sid for sid in run_async(upload_all()) if sid is not None]
+
+        if uploaded:
+            with SessionLocal() as db:
+                with db.begin():
+                    db.bulk_update_mappings(
+                        DataSample,
+                        [{"id": sid, "uploaded_to_ei": True} for sid in uploaded],
+                    )
+
+            # O(1) 計數器累加，check_auto_training 不必掃表
+            redis_client.incrby(UPLOADED_COUNT_KEY, len(uploaded))
+
+            from worker.tasks.training_task import check_auto_training
+
+            check_auto_training.delay()
+
+        return {"status": "success", "uploaded": len(uploaded)}
+    except Exception as e:
+        # Celery auto retry
+        raise self.retry(exc=e, countdown=5, max_retries=3)
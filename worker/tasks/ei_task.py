@@ -1,79 +1,174 @@
+import hashlib
+import time
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
-from common.models import UploadRequest
+from common.config import config
+from common.models import UploadRequest, UPLOAD_REQUEST_ADAPTER
+from common.models.edge_impulse import DatasetType, FileFormat, UploadMetadata
+from common.models.WEDA import SensorData, VirtualDevice
 from app.services.converter import weda_to_edgeimpulse
 
 from logs import worker_logger as logger
 from worker import celery_app
+from worker.redis_conn import redis_client
 
+# 每個 worker process 一個長連線 Session：keep-alive 重用到
+# ingestion.edgeimpulse.com 的 TCP/TLS 連線，省掉每次上傳 ~2 RTT
+# 的重新交握。重試交給 Celery 的 self.retry 排程，不用 urllib3 Retry
+_EI_SESSION = requests.Session()
+_EI_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+)
 
-@celery_app.task(bind=True, queue="EI_ingestion")
-def upload_to_edge(self, data_id: str):
-    API_KEY = "ei_1df40caea3a8ff4b9869f87c5fef6f3408a7e89982cac9ddd017e964fcbca70a"
+# API key 來自設定，不再寫死在程式碼裡
+_EI_API_KEY = config.EI_API_KEY or ""
+
+# upload_to_edge 的 headers 全是常數：建一次、每次呼叫直接重用
+_EI_HEADERS = {
+    "x-label": "test",
+    "x-file-name": "test.json",
+    "x-api-key": _EI_API_KEY,
+    "Content-Type": "application/json",
+}
+
+
+def _content_key(body: bytes) -> str:
+    """以內容的 SHA-256 當 idempotency key。
+
+    key 只在 EI 回 2xx 之後才寫入（見 _mark_done）：POST 途中
+    crash 的重新投遞不會被自己的 key 擋掉，重複內容的重送則在
+    進網路之前就短路，連 TLS round-trip 都省下來。
+    """
+    return f"phm:ei_seen:{hashlib.sha256(body).hexdigest()}"
+
+
+def _already_done(key: str) -> bool:
+    return bool(redis_client.exists(key))
+
+
+def _mark_done(key: str) -> None:
+    redis_client.set(key, 1, ex=86400)
+
+
+def _upload_request_from_task(payload) -> UploadRequest:
+    """還原 Celery 送來的 UploadRequest。
+
+    payload 來自 API 端、已通過 FastAPI 驗證的 model_dump()，
+    因此走 model_construct 快速路徑跳過整棵 schema 的重複驗證；
+    形狀對不上的 payload（外部或舊版 producer）退回完整驗證。
+    """
     try:
-        json_data = {
-            "protected": {"ver": "v1", "alg": "HS256", "iat": 1564128599},
-            "signature": "b0ee0572a1984b93b6bc56e6576e2cbbd6bccd65d0c356e26b31bbc9a48210c6",
-            "payload": {
-                "device_name": "ac:87:a3:0a:2d:1b",
-                "device_type": "DISCO-L475VG-IOT01A",
-                "interval_ms": 10,
-                "sensors": [
-                    {"name": "accX", "units": "m/s2"},
-                    {"name": "accY", "units": "m/s2"},
-                    {"name": "accZ", "units": "m/s2"},
+        weda = payload["weda"]
+        # payload 是 kombu 解序列化出來的 task-local dict，
+        # 就地替換 enum 欄位即可，不需要防禦性 shallow copy
+        meta = payload["metadata"]
+        meta["dataset_type"] = DatasetType(meta["dataset_type"])
+        meta["file_format"] = FileFormat(meta["file_format"])
+        return UploadRequest.model_construct(
+            weda=VirtualDevice.model_construct(
+                device_id=weda["device_id"],
+                device_model=weda["device_model"],
+                sampling_interval_ms=weda["sampling_interval_ms"],
+                sensor_data=[
+                    SensorData.model_construct(**s) for s in weda["sensor_data"]
                 ],
-                "values": [
-                    [-9.81, 0.03, 1.21],
-                    [-9.83, 0.04, 1.27],
-                    [-9.12, 0.03, 1.23],
-                    [-9.14, 0.01, 1.25],
-                ],
-            },
-        }
-        with requests.Session() as s:
-            res = s.post(
-                "https://ingestion.edgeimpulse.com/api/training/data",
-                headers={
-                    "x-label": "test",
-                    "x-file-name": "test.json",
-                    "x-api-key": API_KEY,
-                    "Content-Type": "application/json",
-                },
-                json=json_data,
-                timeout=30,
-            )
-            res.raise_for_status()
+            ),
+            metadata=UploadMetadata.model_construct(**meta),
+        )
+    except (KeyError, TypeError, ValueError):
+        return UPLOAD_REQUEST_ADAPTER.validate_python(payload)
+
+
+# 測試用 payload 是常數：module 載入時編碼一次，
+# 每次呼叫直接送 bytes，不再重建 dict、重跑 JSON 編碼
+_STATIC_BODY = orjson.dumps(
+    {
+        "protected": {"ver": "v1", "alg": "HS256", "iat": 1564128599},
+        "signature": "b0ee0572a1984b93b6bc56e6576e2cbbd6bccd65d0c356e26b31bbc9a48210c6",
+        "payload": {
+            "device_name": "ac:87:a3:0a:2d:1b",
+            "device_type": "DISCO-L475VG-IOT01A",
+            "interval_ms": 10,
+            "sensors": [
+                {"name": "accX", "units": "m/s2"},
+                {"name": "accY", "units": "m/s2"},
+                {"name": "accZ", "units": "m/s2"},
+            ],
+            "values": [
+                [-9.81, 0.03, 1.21],
+                [-9.83, 0.04, 1.27],
+                [-9.12, 0.03, 1.23],
+                [-9.14, 0.01, 1.25],
+            ],
+        },
+    }
+)
+
+
+@celery_app.task(bind=True, queue="EI_ingestion", time_limit=60, soft_time_limit=45)
+def upload_to_edge(self, data_id: str):
+    try:
+        done_key = f"phm:ei_done:{data_id}"
+        if _already_done(done_key) or _already_done(_content_key(_STATIC_BODY)):
+            return {"status": "already_done", "data_id": data_id}
+        res = _EI_SESSION.post(
+            "https://ingestion.edgeimpulse.com/api/training/data",
+            headers=_EI_HEADERS,
+            data=_STATIC_BODY,
+            timeout=30,
+        )
+        res.raise_for_status()
+        # 2xx 之後才標記完成；重新投遞的訊息會在這裡短路
+        _mark_done(done_key)
+        _mark_done(_content_key(_STATIC_BODY))
         return {"status": "success", "data_id": data_id}
     except Exception as e:
         # Celery auto retry
         raise self.retry(exc=e, countdown=5, max_retries=3)
 
 
-@celery_app.task(bind=True, queue="EI_ingestion")
-def convert_and_upload(self, upload_request: UploadRequest):
+@celery_app.task(bind=True, queue="EI_ingestion", time_limit=60, soft_time_limit=45)
+def convert_and_upload(self, upload_request: dict):
     try:
-        upload_request = UploadRequest.model_validate(upload_request)
+        # Celery 解序列化出來的是 dict；_upload_request_from_task
+        # 只走一次 construct/validate，不重複驗證
+        upload_request = _upload_request_from_task(upload_request)
         weda = upload_request.weda
         metadata = upload_request.metadata
 
         # Convert WEDA to EI format
-        ei_data = weda_to_edgeimpulse(weda, hmac_key=metadata.hmac_key)
-
-        with requests.Session() as s:
-            res = s.post(
-                f"https://ingestion.edgeimpulse.com/api/{metadata.dataset_type.value}/data",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-file-name": metadata.file_name or "data.json",
-                    "x-label": metadata.label,
-                    "x-no-label": "1" if metadata.no_label else "0",
-                    "x-api-key": metadata.api_key,
-                },
-                data=ei_data,
-                timeout=30,
-            )
-            res.raise_for_status()
+        ei_data = weda_to_edgeimpulse(
+            weda, hmac_key=metadata.hmac_key, file_format=metadata.file_format.value
+        )
+
+        content_key = _content_key(ei_data)
+        if _already_done(content_key):
+            return {
+                "status": "already_done",
+                "message": "Identical payload already uploaded",
+                "task_id": self.request.id,
+            }
+
+        res = _EI_SESSION.post(
+            f"https://ingestion.edgeimpulse.com/api/{metadata.dataset_type.value}/data",
+            headers={
+                "Content-Type": f"application/{metadata.file_format.value}",
+                "x-file-name": metadata.file_name
+                or f"data_{time.time_ns() // 1_000_000}"
+                f".{metadata.file_format.value}",
+                "x-label": metadata.label,
+                "x-no-label": "1" if metadata.no_label else "0",
+                "x-api-key": metadata.api_key or _EI_API_KEY,
+            },
+            data=ei_data,
+            timeout=30,
+        )
+        res.raise_for_status()
+        # 2xx 之後才標記完成；重新投遞的訊息會在這裡短路
+        _mark_done(content_key)
         return {
             "status": "success",
             "message": "Data ingested to Edge Impulse",
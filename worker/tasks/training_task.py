@@ -0,0 +1,216 @@
+"""
+Training Tasks
+自動訓練觸發、狀態監控與模型部署
+"""
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func, update
+
+from common.config import config
+from logs import worker_logger as logger
+from worker import celery_app
+from worker.db import DataSample, SessionLocal, TrainingJob
+from worker.redis_conn import UPLOADED_COUNT_KEY, redis_client
+
+# API key 來自設定，不再寫死在程式碼裡
+API_KEY = config.EI_API_KEY or ""
+
+# 每個 worker process 一個長連線 Session；訓練輪詢每 30 秒打一次
+# Studio API，keep-alive 重用省掉每次的 TLS 交握
+_STUDIO_SESSION = requests.Session()
+_STUDIO_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+)
+
+
+def _studio_url(path: str) -> str:
+    return (
+        f"{config.EI_API_BASE_URL}/v1/api/{config.EI_PROJECT_ID}{path}"
+    )
+
+
+@celery_app.task(bind=True, queue="EI_training", ignore_result=True)
+def check_auto_training(self):
+    """自上次訓練後的上傳樣本數達到 AUTO_TRAINING_THRESHOLD 且
+    沒有進行中的訓練任務時，觸發一次訓練。
+
+    樣本數讀 Redis 計數器（上傳任務 INCRBY 維護），
+    不再每次上傳都對 data_samples 做一次 COUNT 掃描。
+    """
+    uploaded = int(redis_client.get(UPLOADED_COUNT_KEY) or 0)
+    if uploaded < config.AUTO_TRAINING_THRESHOLD:
+        return {"status": "skipped", "uploaded": uploaded}
+
+    # 多個 worker 可能同時跨過閾值；短 TTL 的 Redis lock 確保
+    # 只有一個會觸發訓練，搶不到鎖的直接放棄（不等待），
+    # 避免重複的 EI 訓練（一跑就是數分鐘到數小時）
+    lock = redis_client.lock(
+        "phm:auto_training_lock", timeout=60, blocking_timeout=0
+    )
+    if not lock.acquire(blocking=False):
+        return {"status": "skipped", "uploaded": uploaded, "locked": True}
+    try:
+        with SessionLocal() as db:
+            in_progress = (
+                db.query(TrainingJob)
+                .filter(TrainingJob.status.in_(("pending", "running")))
+                .count()
+            )
+
+        if in_progress == 0:
+            # 這批樣本視為已消耗；之後的上傳重新累積
+            redis_client.decrby(UPLOADED_COUNT_KEY, uploaded)
+            trigger_training.delay()
+            return {"status": "triggered", "uploaded": uploaded}
+        return {"status": "skipped", "uploaded": uploaded}
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # TTL 到期自動釋放；忽略
+            pass
+
+
+@celery_app.task(bind=True, queue="EI_training", ignore_result=True)
+def reconcile_uploaded_count(self):
+    """每小時以 DB 為準校正 Redis 計數器，吸收 INCR/DECR 與
+    實際上傳之間可能累積的漂移。
+    """
+    with SessionLocal() as db:
+        last_training = db.query(func.max(TrainingJob.created_at)).scalar()
+        q = db.query(func.count(DataSample.id)).filter(
+            DataSample.uploaded_to_ei.is_(True)
+        )
+        if last_training is not None:
+            q = q.filter(DataSample.created_at > last_training)
+        actual = q.scalar() or 0
+    redis_client.set(UPLOADED_COUNT_KEY, actual)
+    return {"status": "success", "count": actual}
+
+
+@celery_app.task(bind=True, queue="EI_training", ignore_result=True)
+def trigger_training(self):
+    """在 Edge Impulse 上啟動訓練，並排程狀態監控。
+
+    TrainingJob row 在 Studio 回 2xx 之後才建立：先建 pending row
+    再 POST 的話，每次 retry 都留下一筆永遠不會被輪詢收掉的
+    pending 孤兒，而 check_auto_training 會把它當成進行中的訓練、
+    從此擋掉所有自動觸發。
+    """
+    try:
+        res = _STUDIO_SESSION.post(
+            _studio_url("/jobs/train/keras"),
+            headers={"x-api-key": API_KEY},
+            json={},
+            timeout=30,
+        )
+        res.raise_for_status()
+        ei_job_id = str(res.json().get("id"))
+
+        with SessionLocal() as db:
+            with db.begin():
+                job = TrainingJob(status="running", ei_job_id=ei_job_id)
+                db.add(job)
+                db.flush()
+                job_id = job.id
+
+        logger.info("Training job %s started (EI job %s)", job_id, ei_job_id)
+        return {"status": "started", "job_id": job_id, "ei_job_id": ei_job_id}
+    except Exception as e:
+        # Celery auto retry
+        raise self.retry(exc=e, countdown=5, max_retries=3)
+
+
+@celery_app.task(bind=True, queue="EI_training", ignore_result=True)
+def poll_pending_trainings(self):
+    """Beat 每 30 秒呼叫一次：一條 SQL 掃出所有進行中的訓練任務，
+    逐一向 Studio API 查狀態、完成的觸發部署。
+
+    取代先前每個 job 各自 apply_async(countdown=30) 遞迴排程的做法：
+    N 個 job 不再是 N 條長壽的自我排程訊息鏈，而是同一次輪詢的
+    N 次 keep-alive 請求。
+    """
+    with SessionLocal() as db:
+        jobs = (
+            db.query(TrainingJob.id, TrainingJob.ei_job_id)
+            .filter(TrainingJob.status == "running")
+            .all()
+        )
+
+    finished = []
+    for job_id, ei_job_id in jobs:
+        # 每個 job 各自隔離錯誤：一個壞掉的 job（失效的 ei_job_id、
+        # 暫時性 5xx）不能讓整輪輪詢中斷、卡住其他 running job
+        try:
+            res = _STUDIO_SESSION.get(
+                _studio_url(f"/jobs/{ei_job_id}/status"),
+                headers={"x-api-key": API_KEY},
+                timeout=30,
+            )
+            res.raise_for_status()
+        except requests.HTTPError as e:
+            status_code = (
+                e.response.status_code if e.response is not None else None
+            )
+            if status_code is not None and 400 <= status_code < 500:
+                # 永久性錯誤（例如 job 已被刪除）：標記 failed，
+                # 不再每 30 秒重打一次
+                logger.warning(
+                    "Training job %s status check got %s; marking failed",
+                    job_id,
+                    status_code,
+                )
+                finished.append((job_id, "failed"))
+            else:
+                logger.warning(
+                    "Training job %s status check failed: %s", job_id, e
+                )
+            continue
+        except requests.RequestException as e:
+            # 連線層的暫時性錯誤：這輪跳過，下輪再試
+            logger.warning(
+                "Training job %s status check failed: %s", job_id, e
+            )
+            continue
+        ei_job = res.json().get("job", {})
+        if ei_job.get("finished"):
+            status = "done" if ei_job.get("finishedSuccessful") else "failed"
+            finished.append((job_id, status))
+
+    if finished:
+        # 每種結果一條 targeted UPDATE，不 hydrate ORM rows
+        done_ids = [job_id for job_id, status in finished if status == "done"]
+        failed_ids = [job_id for job_id, status in finished if status == "failed"]
+        with SessionLocal() as db:
+            with db.begin():
+                for status, ids in (("done", done_ids), ("failed", failed_ids)):
+                    if ids:
+                        db.execute(
+                            update(TrainingJob)
+                            .where(TrainingJob.id.in_(ids))
+                            .values(status=status)
+                        )
+        for job_id in done_ids:
+            deploy_model.delay(job_id)
+
+    return {"status": "success", "polled": len(jobs), "finished": len(finished)}
+
+
+@celery_app.task(bind=True, queue="EI_training", ignore_result=True)
+def deploy_model(self, job_id: int):
+    """訓練完成後建置部署版本"""
+    try:
+        res = _STUDIO_SESSION.post(
+            _studio_url("/jobs/build-ondevice-model"),
+            headers={"x-api-key": API_KEY},
+            json={"engine": "tflite"},
+            timeout=30,
+        )
+        res.raise_for_status()
+        logger.info("Deployment build started for training job %s", job_id)
+        return {"status": "success", "job_id": job_id}
+    except Exception as e:
+        # Celery auto retry
+        raise self.retry(exc=e, countdown=5, max_retries=3)